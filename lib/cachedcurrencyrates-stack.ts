@@ -20,6 +20,7 @@ export class CachedcurrencyratesStack extends cdk.Stack {
       billingMode: dynamodb.BillingMode.PROVISIONED,
       readCapacity: 2,
       writeCapacity: 2,
+      timeToLiveAttribute: "ttl",
     });
 
     const backend = new PythonFunction(this, "backend", {
@@ -1,51 +1,129 @@
 import json
 import hashlib
 import os
-import urllib.request
+import re
+import time
+from collections import OrderedDict
 import urllib.parse
 import logging
 import boto3
+import urllib3
+from botocore.config import Config
 
 logger = logging.getLogger()
-logger.setLevel(logging.INFO)
+logger.setLevel(os.environ.get("LOG_LEVEL", "INFO"))
 
-dynamodb = boto3.resource("dynamodb")
-table = dynamodb.Table(os.environ["TABLE_NAME"])
+TABLE_NAME = os.environ["TABLE_NAME"]
+dynamodb = boto3.client(
+    "dynamodb",
+    config=Config(tcp_keepalive=True, max_pool_connections=10),
+)
+
+# Shared connection pool, reused across warm invocations
+http = urllib3.PoolManager(
+    maxsize=8,
+    retries=False,
+    timeout=urllib3.Timeout(connect=2.0, read=10.0),
+)
+
+# Paths start with "/<domain>", so this completes the upstream URL
+UPSTREAM_URL_PREFIX = "https:/"
 
 # Allowed domains
-ALLOWED_DOMAINS = [
+ALLOWED_DOMAINS = (
     "openexchangerates.org",
     "api.twelvedata.com",
-]
+)
 
 # Cacheable path patterns: domain/path prefix
-CACHEABLE_PATHS = [
+CACHEABLE_PATHS = (
     "openexchangerates.org/api/historical",
     "api.twelvedata.com/eod",
-]
+)
+
+# Precompiled prefix matchers, allowing for leading slashes in the path
+ALLOWED_DOMAINS_RE = re.compile(
+    "/*(?:" + "|".join(map(re.escape, ALLOWED_DOMAINS)) + ")"
+)
+CACHEABLE_PATHS_RE = re.compile(
+    "/*(?:" + "|".join(map(re.escape, CACHEABLE_PATHS)) + ")"
+)
+
+# Cache lifetimes in seconds. Historical rates never change, but EOD
+# requests without an explicit date return the latest close.
+OPENEXCHANGERATES_CACHE_TTL = 60 * 60 * 24 * 90
+TWELVEDATA_CACHE_TTL = 60 * 60 * 24
+
+# In-memory LRU of cached responses, kept across warm invocations
+MEMORY_CACHE_SIZE = 512
+memory_cache = OrderedDict()
+
+# Memoized cache keys for repeated paths, cleared when it grows too large
+REQUEST_HASH_CACHE_SIZE = 4096
+request_hash_cache = {}
 
 
 def is_allowed_domain(path):
     """Check if the domain is allowed."""
-    path_clean = path.lstrip("/")
-    return any(path_clean.startswith(domain) for domain in ALLOWED_DOMAINS)
+    return ALLOWED_DOMAINS_RE.match(path) is not None
 
 
 def is_cacheable_path(path):
     """Check if the path should be cached."""
+    return CACHEABLE_PATHS_RE.match(path) is not None
+
+
+def cache_ttl(path):
+    """Get the number of seconds a cached response for the path stays valid."""
     path_clean = path.lstrip("/")
-    return any(path_clean.startswith(pattern) for pattern in CACHEABLE_PATHS)
+    if path_clean.startswith("api.twelvedata.com"):
+        return TWELVEDATA_CACHE_TTL
+    return OPENEXCHANGERATES_CACHE_TTL
+
 
+def get_request_hash(full_path):
+    """Get the cache key for a full request path."""
+    request_hash = request_hash_cache.get(full_path)
+    if request_hash is None:
+        request_hash = hashlib.blake2b(
+            full_path.encode("utf-8"), digest_size=16
+        ).hexdigest()
+        if len(request_hash_cache) >= REQUEST_HASH_CACHE_SIZE:
+            request_hash_cache.clear()
+        request_hash_cache[full_path] = request_hash
+    return request_hash
 
-def should_cache_response(path, status_code, data):
+
+def memory_cache_get(request_hash):
+    """Get unexpired cached data from the in-memory LRU, or None."""
+    entry = memory_cache.get(request_hash)
+    if entry is None:
+        return None
+    data, expires_at = entry
+    if expires_at < time.time():
+        del memory_cache[request_hash]
+        return None
+    memory_cache.move_to_end(request_hash)
+    return data
+
+
+def memory_cache_put(request_hash, data, expires_at):
+    """Store data in the in-memory LRU, evicting the oldest entry if full."""
+    memory_cache[request_hash] = (data, expires_at)
+    memory_cache.move_to_end(request_hash)
+    if len(memory_cache) > MEMORY_CACHE_SIZE:
+        memory_cache.popitem(last=False)
+
+
+def should_cache_response(cacheable, path, status_code, data):
     """Determine if response should be cached based on path-specific rules."""
-    if not is_cacheable_path(path):
-        logger.info(f"Path not cacheable: {path}")
+    if not cacheable:
+        logger.info("Path not cacheable: %s", path)
         return False
 
     # Only cache HTTP 200 responses
     if status_code != 200:
-        logger.info(f"Status code {status_code} not cacheable")
+        logger.info("Status code %s not cacheable", status_code)
         return False
 
     path_clean = path.lstrip("/")
@@ -54,14 +132,18 @@ def should_cache_response(path, status_code, data):
         logger.info("openexchangerates: caching 200 response")
         return True
     elif path_clean.startswith("api.twelvedata.com"):
-        # For twelvedata, check JSON body for error codes
+        # For twelvedata, check JSON body for error codes. Error responses
+        # always carry a "code" key, so skip parsing when it is absent.
+        if b'"code"' not in data:
+            logger.info("twelvedata: caching successful response")
+            return True
         try:
             json_data = json.loads(data)
             if "code" in json_data:
                 code = json_data["code"]
                 # Don't cache 429 (rate limit) or 5xx errors
                 if code == 429 or (code >= 500 and code < 600):
-                    logger.info(f"twelvedata: not caching error code {code}")
+                    logger.info("twelvedata: not caching error code %s", code)
                     return False
             logger.info("twelvedata: caching successful response")
             return True
@@ -76,33 +158,64 @@ def handler(event, context):
     path = event.get("rawPath", "/")
     query_params = event.get("queryStringParameters") or {}
 
-    logger.info(f"Request received: path={path}, params={query_params}")
+    logger.info("Request received: path=%s, params=%s", path, query_params)
 
     # Validate domain is allowed
     if not is_allowed_domain(path):
-        logger.warning(f"Domain not allowed: {path}")
+        logger.warning("Domain not allowed: %s", path)
         return {
             "statusCode": 403,
             "body": json.dumps({"error": "Domain not allowed"}),
             "headers": {"Content-Type": "application/json"},
         }
 
-    # Build full upstream URL (path includes domain)
-    query_string = urllib.parse.urlencode(query_params)
-    full_path = f"{path}?{query_string}" if query_string else path
-    upstream_url = f"https:/{full_path}"
+    # Build full upstream URL (path includes domain). Parameters are sorted
+    # so the same request always maps to the same cache key.
+    if query_params:
+        query_string = urllib.parse.urlencode(sorted(query_params.items()))
+        full_path = path + "?" + query_string
+    else:
+        full_path = path
+    upstream_url = UPSTREAM_URL_PREFIX + full_path
 
-    if is_cacheable_path(path):
+    cacheable = is_cacheable_path(path)
+    if cacheable:
         # Generate hash for cache key
-        request_hash = hashlib.sha256(full_path.encode()).hexdigest()
-        logger.info(f"Cacheable path detected, hash={request_hash}")
+        request_hash = get_request_hash(full_path)
+        key = {"requestHash": {"S": request_hash}}
+        logger.info("Cacheable path detected, hash=%s", request_hash)
 
         # Try to get from cache
+        cached_data = memory_cache_get(request_hash)
+        if cached_data is not None:
+            logger.info("Memory cache HIT for hash=%s", request_hash)
+            return {
+                "statusCode": 200,
+                "body": cached_data,
+                "headers": {
+                    "Content-Type": "application/json",
+                    "X-Cache": "HIT",
+                },
+            }
+
         try:
-            response = table.get_item(Key={"requestHash": request_hash})
-            if "Item" in response:
-                cached_data = response["Item"]["data"]
-                logger.info(f"Cache HIT for hash={request_hash}")
+            response = dynamodb.get_item(
+                TableName=TABLE_NAME,
+                Key=key,
+                ProjectionExpression="#d, #t",
+                ExpressionAttributeNames={"#d": "data", "#t": "ttl"},
+            )
+            item = response.get("Item")
+            expires_at = (
+                int(item["ttl"]["N"]) if item and "ttl" in item else float("inf")
+            )
+            # DynamoDB removes expired items lazily, so check the TTL too
+            if item and expires_at < time.time():
+                logger.info("Cache EXPIRED for hash=%s", request_hash)
+            elif item:
+                cached_data = item["data"]["S"]
+                memory_cache_put(request_hash, cached_data, expires_at)
+                logger.info("Cache HIT for hash=%s", request_hash)
                 return {
                     "statusCode": 200,
                     "body": cached_data,
@@ -111,56 +224,79 @@ def handler(event, context):
                         "X-Cache": "HIT",
                     },
                 }
-            logger.info(f"Cache MISS for hash={request_hash}")
+            logger.info("Cache MISS for hash=%s", request_hash)
         except Exception as e:
-            logger.error(f"Cache lookup error: {e}")
+            logger.error("Cache lookup error: %s", e)
 
     # Make upstream request
     try:
-        logger.info(f"Making upstream request to: {upstream_url}")
-        req = urllib.request.Request(
-            upstream_url, headers={"accept": "application/json"}
+        logger.info("Making upstream request to: %s", upstream_url)
+        response = http.request(
+            "GET",
+            upstream_url,
+            headers={"accept": "application/json"},
+            preload_content=False,
+        )
+        try:
+            status_code = response.status
+            raw_data = response.data
+        finally:
+            response.release_conn()
+        logger.info(
+            "Upstream response: status=%s, data_length=%d",
+            status_code,
+            len(raw_data),
         )
-        with urllib.request.urlopen(req) as response:
-            status_code = response.getcode()
-            data = response.read().decode("utf-8")
-            logger.info(
-                f"Upstream response: status={status_code}, data_length={len(data)}"
-            )
 
-            # Check if we should cache this response
-            should_cache = should_cache_response(path, status_code, data)
-            logger.info(f"Should cache response: {should_cache}")
-
-            if should_cache:
-                try:
-                    table.put_item(
-                        Item={
-                            "requestHash": request_hash,
-                            "data": data,
-                        }
-                    )
-                    logger.info(f"Cached response for hash={request_hash}")
-                except Exception as e:
-                    logger.error(f"Cache write error: {e}")
+        # Check if we should cache this response
+        should_cache = should_cache_response(cacheable, path, status_code, raw_data)
+        data = raw_data.decode("utf-8")
+        logger.info("Should cache response: %s", should_cache)
 
-            return {
-                "statusCode": status_code,
-                "body": data,
-                "headers": {
-                    "Content-Type": "application/json",
-                    "X-Cache": "MISS",
-                },
-            }
-    except urllib.error.HTTPError as e:
-        logger.error(f"HTTP error from upstream: {e.code} - {e}")
+        if should_cache:
+            expires_at = int(time.time()) + cache_ttl(path)
+            try:
+                dynamodb.put_item(
+                    TableName=TABLE_NAME,
+                    Item={
+                        **key,
+                        "data": {"S": data},
+                        "ttl": {"N": str(expires_at)},
+                    },
+                    # Skip the write if a concurrent request already cached
+                    # this key, unless that item has expired
+                    ConditionExpression=(
+                        "attribute_not_exists(requestHash) OR #t < :now"
+                    ),
+                    ExpressionAttributeNames={"#t": "ttl"},
+                    ExpressionAttributeValues={
+                        ":now": {"N": str(int(time.time()))},
+                    },
+                )
+                memory_cache_put(request_hash, data, expires_at)
+                logger.info("Cached response for hash=%s", request_hash)
+            except dynamodb.exceptions.ConditionalCheckFailedException:
+                logger.info("Already cached for hash=%s", request_hash)
+            except Exception as e:
+                logger.error("Cache write error: %s", e)
+
+        return {
+            "statusCode": status_code,
+            "body": data,
+            "headers": {
+                "Content-Type": "application/json",
+                "X-Cache": "MISS",
+            },
+        }
+    except urllib3.exceptions.HTTPError as e:
+        logger.error("HTTP error from upstream: %s", e)
         return {
-            "statusCode": e.code,
+            "statusCode": 502,
             "body": json.dumps({"error": str(e)}),
             "headers": {"Content-Type": "application/json"},
         }
     except Exception as e:
-        logger.error(f"Unexpected error: {e}")
+        logger.error("Unexpected error: %s", e)
         return {
             "statusCode": 500,
             "body": json.dumps({"error": str(e)}),